@@ -0,0 +1,289 @@
+/*
+ * Batch lookups against a C-typed snapshot of a NetworkFinder's sorted
+ * network list. The searches run without holding the GIL, so threads can
+ * search the same table in parallel.
+ */
+#define PY_SSIZE_T_CLEAN
+#include "Python.h"
+#include <stdint.h>
+
+/* An IPv4 or IPv6 address, split into two 64-bit halves */
+typedef struct {
+    uint64_t hi;
+    uint64_t lo;
+} addr_t;
+
+/* Cached integers for splitting an address into its two halves */
+static PyObject *sixty_four = NULL;
+static PyObject *low_mask = NULL;
+
+static int
+addr_le(const addr_t *a, const addr_t *b)
+{
+    return (a->hi < b->hi) || ((a->hi == b->hi) && (a->lo <= b->lo));
+}
+
+/*
+ * Copies a sequence of non-negative integers into a new array of addr_t.
+ * Integers that don't fit in 128 bits raise OverflowError.
+ */
+static addr_t *
+addrs_from_sequence(PyObject *obj, Py_ssize_t *size)
+{
+    PyObject *seq, *item, *half;
+    addr_t *addrs;
+    Py_ssize_t i, n;
+
+    seq = PySequence_Fast(obj, "expected a sequence of integers");
+    if (seq == NULL) {
+        return NULL;
+    }
+
+    n = PySequence_Fast_GET_SIZE(seq);
+    addrs = PyMem_Malloc((n ? n : 1) * sizeof(addr_t));
+    if (addrs == NULL) {
+        Py_DECREF(seq);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    for (i = 0; i < n; i++) {
+        item = PySequence_Fast_GET_ITEM(seq, i);
+
+        /* Negative or too-large integers leave this out of range */
+        half = PyNumber_Rshift(item, sixty_four);
+        if (half == NULL) {
+            goto error;
+        }
+        addrs[i].hi = PyLong_AsUnsignedLongLong(half);
+        Py_DECREF(half);
+        if (PyErr_Occurred()) {
+            goto error;
+        }
+
+        half = PyNumber_And(item, low_mask);
+        if (half == NULL) {
+            goto error;
+        }
+        addrs[i].lo = PyLong_AsUnsignedLongLong(half);
+        Py_DECREF(half);
+        if (PyErr_Occurred()) {
+            goto error;
+        }
+    }
+
+    Py_DECREF(seq);
+    *size = n;
+    return addrs;
+
+error:
+    Py_DECREF(seq);
+    PyMem_Free(addrs);
+    return NULL;
+}
+
+typedef struct {
+    PyObject_HEAD
+    Py_ssize_t size;
+    addr_t *net;
+    addr_t *bcast;
+    Py_ssize_t *parent;
+} TableObject;
+
+static void
+Table_dealloc(TableObject *self)
+{
+    PyMem_Free(self->net);
+    PyMem_Free(self->bcast);
+    PyMem_Free(self->parent);
+    Py_TYPE(self)->tp_free((PyObject *)self);
+}
+
+static PyObject *
+Table_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"net_ints", "bcast_ints", NULL};
+    PyObject *net_ints, *bcast_ints;
+    Py_ssize_t bcast_size, i, j;
+    TableObject *self;
+
+    if (!PyArg_ParseTupleAndKeywords(
+            args, kwds, "OO:Table", kwlist, &net_ints, &bcast_ints)) {
+        return NULL;
+    }
+
+    self = (TableObject *)type->tp_alloc(type, 0);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    self->net = addrs_from_sequence(net_ints, &self->size);
+    if (self->net == NULL) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    self->bcast = addrs_from_sequence(bcast_ints, &bcast_size);
+    if (self->bcast == NULL) {
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    if (bcast_size != self->size) {
+        PyErr_SetString(
+            PyExc_ValueError, "net_ints and bcast_ints must be the same size"
+        );
+        Py_DECREF(self);
+        return NULL;
+    }
+
+    /*
+     * Record the nearest earlier network that contains each network, so
+     * that searches only have to walk back through enclosing networks.
+     */
+    self->parent = PyMem_Malloc(
+        (self->size ? self->size : 1) * sizeof(Py_ssize_t)
+    );
+    if (self->parent == NULL) {
+        Py_DECREF(self);
+        return PyErr_NoMemory();
+    }
+    for (i = 0; i < self->size; i++) {
+        j = i - 1;
+        while ((j != -1) && !addr_le(&self->bcast[i], &self->bcast[j])) {
+            j = self->parent[j];
+        }
+        self->parent[i] = j;
+    }
+
+    return (PyObject *)self;
+}
+
+static PyObject *
+Table_search_best(TableObject *self, PyObject *queries)
+{
+    addr_t *addrs;
+    Py_ssize_t *found;
+    Py_ssize_t i, n, lo, hi, mid;
+    PyObject *ret, *item;
+
+    addrs = addrs_from_sequence(queries, &n);
+    if (addrs == NULL) {
+        return NULL;
+    }
+
+    found = PyMem_Malloc((n ? n : 1) * sizeof(Py_ssize_t));
+    if (found == NULL) {
+        PyMem_Free(addrs);
+        return PyErr_NoMemory();
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < n; i++) {
+        /* Find the first network that starts after the address... */
+        lo = 0;
+        hi = self->size;
+        while (lo < hi) {
+            mid = lo + ((hi - lo) / 2);
+            if (addr_le(&self->net[mid], &addrs[i])) {
+                lo = mid + 1;
+            }
+            else {
+                hi = mid;
+            }
+        }
+
+        /* ...and walk back to the first one that contains it */
+        lo--;
+        while ((lo != -1) && !addr_le(&addrs[i], &self->bcast[lo])) {
+            lo = self->parent[lo];
+        }
+        found[i] = lo;
+    }
+    Py_END_ALLOW_THREADS
+
+    PyMem_Free(addrs);
+
+    ret = PyList_New(n);
+    if (ret == NULL) {
+        PyMem_Free(found);
+        return NULL;
+    }
+    for (i = 0; i < n; i++) {
+        item = PyLong_FromSsize_t(found[i]);
+        if (item == NULL) {
+            Py_DECREF(ret);
+            PyMem_Free(found);
+            return NULL;
+        }
+        PyList_SET_ITEM(ret, i, item);
+    }
+
+    PyMem_Free(found);
+    return ret;
+}
+
+static PyMethodDef Table_methods[] = {
+    {
+        "search_best",
+        (PyCFunction)Table_search_best,
+        METH_O,
+        "For each address in `queries`, returns the index of the network "
+        "with the longest prefix that contains it, or -1 if there is none.",
+    },
+    {NULL, NULL, 0, NULL},
+};
+
+static PyTypeObject TableType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    "network_finder._search.Table", /* tp_name */
+    sizeof(TableObject),            /* tp_basicsize */
+};
+
+static struct PyModuleDef search_module = {
+    PyModuleDef_HEAD_INIT,
+    "network_finder._search",
+    "GIL-releasing batch searches of sorted network tables",
+    -1,
+    NULL,
+};
+
+PyMODINIT_FUNC
+PyInit__search(void)
+{
+    PyObject *module;
+
+    TableType.tp_dealloc = (destructor)Table_dealloc;
+    TableType.tp_flags = Py_TPFLAGS_DEFAULT;
+    TableType.tp_doc = "Table(net_ints, bcast_ints)\n\n"
+                       "An immutable snapshot of a sorted network list.";
+    TableType.tp_methods = Table_methods;
+    TableType.tp_new = Table_new;
+    if (PyType_Ready(&TableType) < 0) {
+        return NULL;
+    }
+
+    sixty_four = PyLong_FromLong(64);
+    if (sixty_four == NULL) {
+        return NULL;
+    }
+
+    low_mask = PyLong_FromUnsignedLongLong(UINT64_MAX);
+    if (low_mask == NULL) {
+        return NULL;
+    }
+
+    module = PyModule_Create(&search_module);
+    if (module == NULL) {
+        return NULL;
+    }
+
+    Py_INCREF(&TableType);
+    if (PyModule_AddObject(module, "Table", (PyObject *)&TableType) < 0) {
+        Py_DECREF(&TableType);
+        Py_DECREF(module);
+        return NULL;
+    }
+
+    return module;
+}
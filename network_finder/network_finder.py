@@ -1,15 +1,64 @@
 from __future__ import unicode_literals
 from bisect import bisect_left, bisect_right
+from copy import copy, deepcopy
 from functools import total_ordering
+from operator import attrgetter
 from socket import AF_INET6, inet_aton, inet_ntoa, inet_ntop, inet_pton
 from struct import Struct
 from sys import version_info
 
 integer_types = (int, long) if (version_info[0] == 2) else (int,)  # noqa
+interned_types = (bytes, type('')) + integer_types
 ipv4_struct = Struct(b'!I')
 ipv6_struct = Struct(b'!QQ')
 
 
+class _Table(object):
+    """
+    A snapshot of a sorted network list for batch searches. This is used
+    when the `_search` C extension (which releases the GIL) is unavailable.
+    """
+
+    def __init__(self, net_ints, bcast_ints):
+        self.net_ints = list(net_ints)
+        self.bcast_ints = list(bcast_ints)
+        if len(self.net_ints) != len(self.bcast_ints):
+            raise ValueError('net_ints and bcast_ints must be the same size')
+        self._check_range(self.net_ints + self.bcast_ints)
+
+        # Record the nearest earlier network that contains each network, so
+        # that searches only have to walk back through enclosing networks.
+        self.parents = []
+        for i, bcast_int in enumerate(self.bcast_ints):
+            j = i - 1
+            while (j != -1) and (self.bcast_ints[j] < bcast_int):
+                j = self.parents[j]
+            self.parents.append(j)
+
+    def search_best(self, queries, bisect_right=bisect_right):
+        self._check_range(queries)
+        ret = []
+        for ip_int in queries:
+            i = bisect_right(self.net_ints, ip_int) - 1
+            while (i != -1) and (self.bcast_ints[i] < ip_int):
+                i = self.parents[i]
+            ret.append(i)
+
+        return ret
+
+    @staticmethod
+    def _check_range(ip_ints, max_int=(1 << 128) - 1):
+        # Like the C extension, only accept 128-bit unsigned integers
+        if ip_ints and not (0 <= min(ip_ints) and max(ip_ints) <= max_int):
+            raise OverflowError('Addresses must fit in 128 bits')
+
+
+try:
+    from ._search import Table
+except ImportError:  # pragma: no cover
+    Table = _Table
+
+
 def ip_mask(length, bits):
     if not (0 <= length <= bits):
         raise ValueError('Invalid length: {}'.format(length))
@@ -48,6 +97,41 @@ class BaseIPNetwork(object):
         self.bcast_int = self.net_int + span
         self._data = data
 
+    @classmethod
+    def from_range(cls, first, last, data=None):
+        """
+        Returns the smallest list of networks that covers the addresses from
+        `first` to `last`, inclusive. Each network gets its own copy of `data`.
+        """
+        if not isinstance(first, integer_types):
+            first = cls.ip_to_int(first)
+        if not isinstance(last, integer_types):
+            last = cls.ip_to_int(last)
+        if not (0 <= first <= last <= cls.mask_cache[cls.bits]):
+            raise ValueError('Invalid range: {} - {}'.format(first, last))
+
+        if (data is not None) and (not isinstance(data, dict)):
+            raise ValueError('data argument must be a dict')
+
+        ret = []
+        while first <= last:
+            # The largest network starting at `first` is limited both by the
+            # number of addresses remaining and by the alignment of `first`.
+            length = cls.bits - ((last - first + 1).bit_length() - 1)
+            while first & cls.mask_cache[length] != first:
+                length += 1
+
+            network = cls.__new__(cls)
+            network.length = length
+            network.net_int = first
+            network.bcast_int = first + (1 << (cls.bits - length)) - 1
+            network._data = None if data is None else dict(data)
+            ret.append(network)
+
+            first = network.bcast_int + 1
+
+        return ret
+
     @property
     def network_address(self):
         return self.ip_from_int(self.net_int)
@@ -77,6 +161,10 @@ class BaseIPNetwork(object):
         )
 
     def __getattr__(self, attr):
+        # _data is unset while the network is being copied
+        if attr == '_data':
+            raise AttributeError(attr)
+
         try:
             return self._data[attr]
         except (TypeError, KeyError):
@@ -135,31 +223,401 @@ class IPv6Network(BaseIPNetwork):
         return inet_ntop(af, pack(ip_int >> 64, ip_int & 0xFFFFFFFFFFFFFFFF))
 
 
+class ColumnStore(object):
+    """
+    Stores user data for networks in one list per field, rather than in a
+    dict per network. Each network's data is a row number. Repeated strings
+    and integers are interned, so they're only stored once; interned values
+    are dropped when no row uses them. Unset fields are None.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.columns = {field: [] for field in self.fields}
+        self._size = 0
+        self._free_rows = []
+        self._interned = {}
+
+    def add_row(self, data):
+        """
+        Stores the dict `data` in a new row and returns its number.
+        """
+        self._check_fields(data)
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = self._size
+            self._size += 1
+            for column in self.columns.values():
+                column.append(None)
+
+        self.update_row(row, data)
+        return row
+
+    def update_row(self, row, data):
+        """
+        Sets the fields in the dict `data` for `row`.
+        """
+        self._check_fields(data)
+        for field, value in data.items():
+            column = self.columns[field]
+            value = self._intern(value)
+            self._release(column[row])
+            column[row] = value
+
+    def get_row(self, row):
+        """
+        Returns a dict with the fields that are set for `row`.
+        """
+        ret = {}
+        for field, column in self.columns.items():
+            value = column[row]
+            if value is not None:
+                ret[field] = value
+
+        return ret
+
+    def free_row(self, row):
+        """
+        Clears `row` so that it can be reused.
+        """
+        for column in self.columns.values():
+            self._release(column[row])
+            column[row] = None
+        self._free_rows.append(row)
+
+    def _check_fields(self, data):
+        for field in data:
+            if field not in self.columns:
+                raise ValueError('Unknown field: {}'.format(field))
+
+    def _intern(self, value):
+        # Interned values are kept with a count of the cells that use them.
+        # Only values of types whose equal values are interchangeable are
+        # interned; e.g. -0.0 == 0.0, but they print differently. Key on the
+        # type too, so that e.g. 1 and True aren't conflated.
+        if type(value) not in interned_types:
+            return value
+
+        key = type(value), value
+        entry = self._interned.get(key)
+        if entry is None:
+            entry = self._interned[key] = [value, 0]
+        entry[1] += 1
+        return entry[0]
+
+    def _release(self, value):
+        if type(value) not in interned_types:
+            return
+
+        key = type(value), value
+        entry = self._interned[key]
+        entry[1] -= 1
+        if not entry[1]:
+            del self._interned[key]
+
+
+class ColumnarNetwork(BaseIPNetwork):
+    """
+    Mixin for networks whose user data is kept in a `ColumnStore`. Rather
+    than a dict, `_data` is a row number in the store (or None). Assigning a
+    dict to `_data` stores its fields in the row; assigning None frees it.
+    Copies (and pickles) are plain networks with their data in a dict.
+    """
+
+    __slots__ = []
+    _store = None
+    _detached_class = None
+
+    def __getattr__(self, attr):
+        # Fields are properties on the finder's class, so this is only
+        # reached for unknown attributes
+        raise AttributeError(attr)
+
+    @staticmethod
+    def _field_property(column):
+        """
+        Returns a property that reads a field's value from its `column`.
+        """
+
+        def fget(self):
+            row = self._data
+            return None if (row is None) else column[row]
+
+        return property(fget)
+
+    def __gt__(self, other):
+        # Comparisons with plain networks (e.g. lookup probes) try this
+        # first, so don't leave it to total_ordering
+        if self.net_int > other.net_int:
+            return True
+
+        if self.net_int < other.net_int:
+            return False
+
+        return self.length > other.length
+
+    def __setattr__(
+        self, attr, value, slots=('net_int', 'bcast_int', 'length')
+    ):
+        if attr in slots:
+            return object.__setattr__(self, attr, value)
+
+        if attr == '_data':
+            row = self._data
+            if value is None:
+                if row is not None:
+                    self._store.free_row(row)
+            elif isinstance(value, dict):
+                if row is None:
+                    value = self._store.add_row(value)
+                else:
+                    self._store.update_row(row, value)
+                    value = row
+            else:
+                raise ValueError('data argument must be a dict')
+        elif attr in self._store.columns:
+            if self._data is None:
+                self._data = {attr: value}
+            else:
+                self._store.update_row(self._data, {attr: value})
+            return
+        else:
+            raise AttributeError('Unknown field: {}'.format(attr))
+
+        object.__setattr__(self, attr, value)
+
+    def __reduce__(self):
+        # Copies mustn't share this network's row, so copy a plain network
+        cidr = '{}/{}'.format(self.network_address, self.length)
+        return self._detached_class, (cidr, self._get_data())
+
+    @classmethod
+    def _attach(cls, network):
+        """
+        Turns the plain `network` into one of this class, moving its data
+        out of its dict and into the store.
+        """
+        data = network._data
+        object.__setattr__(network, '__class__', cls)
+        object.__setattr__(network, '_data', None)
+        if data:
+            network._data = data
+
+        return network
+
+    def _detach(self):
+        """
+        Moves this network's data out of the store and into a dict, and
+        turns it into a plain network that no longer uses the store.
+        """
+        data = self._get_data()
+        self._data = None
+        object.__setattr__(self, '__class__', self._detached_class)
+        self._data = data
+
+    def _get_data(self):
+        row = self._data
+        return None if (row is None) else (self._store.get_row(row) or None)
+
+
 class NetworkFinder(object):
-    def __init__(self, IPNetwork=IPv4Network):
+    def __init__(self, IPNetwork=IPv4Network, fields=None):
+        """
+        Networks are parsed with `IPNetwork`. If a sequence of `fields` is
+        given, user data for those fields is kept in a `ColumnStore` instead
+        of a dict per network.
+        """
         self._network_list = []
+        self._changes = 0
+        self._snapshot = None
+        self._store = None
+        self._ColumnarNetwork = None
+        if fields is not None:
+            self._store = ColumnStore(fields)
+            namespace = {
+                '__slots__': [],
+                '_store': self._store,
+                '_detached_class': IPNetwork,
+            }
+            for field, column in self._store.columns.items():
+                if hasattr(ColumnarNetwork, field) or hasattr(
+                    IPNetwork, field
+                ):
+                    raise ValueError('Invalid field: {}'.format(field))
+                namespace[field] = ColumnarNetwork._field_property(column)
+
+            self._ColumnarNetwork = type(
+                IPNetwork.__name__, (ColumnarNetwork, IPNetwork), namespace
+            )
+
         self.IPNetwork = IPNetwork
 
-    def add(self, cidr, data=None, bisect_right=bisect_right):
+    def __copy__(self):
+        # Columnar networks are tied to their finder's store, so they can't be
+        # shared. Shallow copies get plain copies of them instead.
+        fields = None if (self._store is None) else self._store.fields
+        ret = self.__class__(self.IPNetwork, fields)
+        if self._store is None:
+            ret._network_list = list(self._network_list)
+        else:
+            ret._network_list = [
+                ret._attach(copy(network)) for network in self._network_list
+            ]
+        return ret
+
+    def __deepcopy__(self, memo):
+        # Copied networks are plain, so they're given rows in the copy's store
+        fields = None if (self._store is None) else self._store.fields
+        ret = self.__class__(self.IPNetwork, fields)
+        memo[id(self)] = ret
+        ret._network_list = [
+            ret._attach(deepcopy(network, memo))
+            for network in self._network_list
+        ]
+        return ret
+
+    def __reduce__(self):
+        # Like copies, pickles are rebuilt from the networks alone. Columnar
+        # networks pickle as plain ones, so they're given rows in the new
+        # finder's store. The batch search snapshot (which may be a C table)
+        # isn't kept; it's rebuilt on the next batch search.
+        fields = None if (self._store is None) else self._store.fields
+        return self.__class__, (self.IPNetwork, fields), self._network_list
+
+    def __setstate__(self, state):
+        # Finders pickled by earlier versions have their __dict__ as state
+        if isinstance(state, dict):
+            self.__init__(state['IPNetwork'])
+            state = state['_network_list']
+
+        self._network_list = [self._attach(network) for network in state]
+
+    def __iter__(self):
+        return self._iter_slice(0, len(self._network_list))
+
+    def __len__(self):
+        return len(self._network_list)
+
+    def add(self, cidr, data=None):
         """
         Inserts the network described by `cidr`. Returns the inserted
         network object. Does not insert duplicate networks.
         """
         network = self.IPNetwork(cidr, data)
+        return self._insert(network)
+
+    def add_range(self, first, last, data=None):
+        """
+        Inserts the fewest networks that cover the addresses from `first` to
+        `last`, inclusive. Returns a list of the inserted network objects.
+        """
+        return [
+            self._insert(network)
+            for network in self.IPNetwork.from_range(first, last, data)
+        ]
+
+    def add_ranges(
+        self,
+        ranges,
+        key=attrgetter('net_int', 'length'),
+        bisect_right=bisect_right,
+    ):
+        """
+        Inserts the networks covering each of the `ranges`, which should be
+        an iterable of `(first, last)` or `(first, last, data)` tuples. This
+        is faster than calling `add_range` repeatedly.
+
+        A few networks are inserted in place, as `add_range` does. Larger
+        batches rebuild the list, which takes time in proportion to the
+        finder's size, so it's best to add many ranges at once.
+        """
+        from_range = self.IPNetwork.from_range
+        networks = []
+        for args in ranges:
+            networks.extend(from_range(*args))
+
+        # Check the data before the list is rebuilt, so that a bad field
+        # doesn't leave the finder with only some of its networks.
+        if self._store is not None:
+            for network in networks:
+                if network._data:
+                    self._store._check_fields(network._data)
+
+        # Moving the list's items along to insert a network is much faster
+        # than copying the list, so a few networks are inserted in place.
+        if len(networks) <= 32:
+            for network in networks:
+                self._insert(network)
+            self._changes += 1
+            return
+
+        networks.sort(key=key)
+
+        # Searching for each new network is cheaper than sorting everything
+        # unless the batch is large. Otherwise the existing list and the new
+        # networks are each sorted runs, so this sort is a merge. It's
+        # stable, so existing networks come first.
+        network_list = self._network_list
+        size = len(network_list)
+        if len(networks) * size.bit_length() > size:
+            networks = network_list + networks
+            networks.sort(key=key)
+            network_list = []
+
+        # Copy the existing networks between each new one in slices
+        ret = []
+        start = 0
+        for network in networks:
+            i = bisect_right(network_list, network, start)
+            if i != start:
+                ret.extend(network_list[start:i])
+                start = i
+
+            if ret and network == ret[-1]:
+                self._merge(ret[-1], network)
+            else:
+                ret.append(self._attach(network))
+        ret.extend(network_list[start:])
+
+        self._network_list = ret
+        self._snapshot = None
+        self._changes += 1
 
+    def _insert(self, network, bisect_right=bisect_right):
         # If the network is already present, don't add another instance
         i = bisect_right(self._network_list, network)
         if i and network == self._network_list[i - 1]:
             existing = self._network_list[i - 1]
-            if data and existing._data:
-                existing._data.update(data)
-            elif data:
-                existing._data = data
+            self._merge(existing, network)
             return existing
 
-        self._network_list.insert(i, network)
+        self._network_list.insert(i, self._attach(network))
+        self._snapshot = None
+        self._changes += 1
         return network
 
+    def _attach(self, network):
+        # New networks are plain; in columnar mode their data is moved into
+        # the store once they're part of the list.
+        if (self._ColumnarNetwork is not None) and (
+            not isinstance(network, ColumnarNetwork)
+        ):
+            self._ColumnarNetwork._attach(network)
+
+        return network
+
+    def _merge(self, existing, network):
+        data = network._data
+        if self._store is not None:
+            # Assigning a dict to a columnar network's data updates its row
+            if data:
+                existing._data = data
+        elif data and existing._data:
+            existing._data.update(data)
+        elif data:
+            existing._data = data
+
     def delete(self, cidr, bisect_right=bisect_right):
         """
         Deletes the network described by `cidr`. Raises KeyError if the network
@@ -168,7 +626,11 @@ class NetworkFinder(object):
         network = self.IPNetwork(cidr)
         i = bisect_right(self._network_list, network)
         if i and network == self._network_list[i - 1]:
-            del self._network_list[i - 1]
+            network = self._network_list.pop(i - 1)
+            self._snapshot = None
+            self._changes += 1
+            if self._store is not None:
+                network._detach()
         else:
             raise KeyError('{} not found'.format(network))
 
@@ -201,6 +663,55 @@ class NetworkFinder(object):
 
         return None
 
+    def search_best_batch(self, addresses, executor=None, chunk_size=65536):
+        """
+        Finds the network with the longest prefix that matches each of the
+        IP addresses in `addresses`. Returns a list with the matching network
+        (or None) for each address. Unlike `search_best`, only addresses (not
+        CIDR networks) may be searched for.
+
+        When the C extension is available the searches don't hold the GIL, so
+        passing a `concurrent.futures.ThreadPoolExecutor` as `executor` will
+        split them across its threads, `chunk_size` addresses at a time.
+        """
+        ip_to_int = self.IPNetwork.ip_to_int
+        max_int = self.IPNetwork.mask_cache[self.IPNetwork.bits]
+        queries = []
+        for address in addresses:
+            if isinstance(address, integer_types):
+                if not (0 <= address <= max_int):
+                    raise ValueError('Invalid address: {}'.format(address))
+                queries.append(address)
+            elif '/' in address:
+                raise ValueError('Invalid address: {}'.format(address))
+            else:
+                queries.append(ip_to_int(address))
+
+        # Search a snapshot of the list, so that changes made by other
+        # threads don't affect the results.
+        if self._snapshot is None:
+            network_list = tuple(self._network_list)
+            table = Table(
+                [x.net_int for x in network_list],
+                [x.bcast_int for x in network_list],
+            )
+            self._snapshot = table, network_list
+        table, network_list = self._snapshot
+
+        if executor is None:
+            found = table.search_best(queries)
+        else:
+            chunks = []
+            for start in range(0, len(queries), chunk_size):
+                stop = start + chunk_size
+                chunks.append(queries[start:stop])
+
+            found = []
+            for chunk_found in executor.map(table.search_best, chunks):
+                found.extend(chunk_found)
+
+        return [network_list[i] if (i >= 0) else None for i in found]
+
     def search_worst(self, cidr, bisect_right=bisect_right):
         """
         Finds the network with the shortest prefix that matches the network
@@ -217,21 +728,66 @@ class NetworkFinder(object):
 
         return ret
 
-    def search_covered(self, cidr, bisect_left=bisect_left):
+    def search_covered(self, cidr):
         """
         Finds the networks that are contained by the network described by
         `cidr`. Returns an empty list if there are none.
         """
+        return list(self.iter_covered(cidr))
+
+    def iter_covered(
+        self, cidr, bisect_left=bisect_left, bisect_right=bisect_right
+    ):
+        """
+        Yields the networks that are contained by the network described by
+        `cidr`, in sorted order. Raises RuntimeError if the finder is changed
+        while iterating.
+        """
         network = self.IPNetwork(cidr)
-        i = bisect_left(self._network_list, network)
-        ret = []
-        while i != len(self._network_list):
-            found = self._network_list[i]
-            if found in network:
-                ret.append(found)
-            i += 1
 
-        return ret
+        # Every network whose address is inside of the search network is
+        # contained by it, so there's no need to check each one.
+        start = bisect_left(self._network_list, network)
+        last = self.IPNetwork(network.bcast_int)
+        end = bisect_right(self._network_list, last)
+        return self._iter_slice(start, end)
+
+    def iter_range(
+        self, first, last, bisect_left=bisect_left, bisect_right=bisect_right
+    ):
+        """
+        Yields the networks whose network addresses are between `first` and
+        `last`, inclusive, in sorted order. Raises ValueError if either address
+        is out of range, and RuntimeError if the finder is changed while
+        iterating.
+        """
+        if not isinstance(first, integer_types):
+            first = self.IPNetwork.ip_to_int(first)
+        if not isinstance(last, integer_types):
+            last = self.IPNetwork.ip_to_int(last)
+        max_int = self.IPNetwork.mask_cache[self.IPNetwork.bits]
+        if not ((0 <= first <= max_int) and (0 <= last <= max_int)):
+            raise ValueError('Invalid range: {} - {}'.format(first, last))
+
+        # Networks sort by address and then length, so the start is found
+        # with the shortest possible network at `first`, and the end with
+        # the longest possible network at `last`.
+        probe = self.IPNetwork(first)
+        probe.length = 0
+        start = bisect_left(self._network_list, probe)
+        end = bisect_right(self._network_list, self.IPNetwork(last))
+        return self._iter_slice(start, end)
+
+    def _iter_slice(self, start, end):
+        # Like iterating over a dict, changing the finder while iterating
+        # raises RuntimeError.
+        return self._iter_list(self._network_list, self._changes, start, end)
+
+    def _iter_list(self, network_list, changes, start, end):
+        for i in range(start, end):
+            if self._changes != changes:
+                raise RuntimeError('NetworkFinder changed during iteration')
+            yield network_list[i]
 
     def search_covering(self, cidr, bisect_right=bisect_right):
         """
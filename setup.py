@@ -10,7 +10,12 @@ else:
         ['network_finder/network_finder.c'],
         extra_compile_args=["-O3"],
     )
-    ext_modules = [cython_extension]
+    search_extension = Extension(
+        'network_finder._search',
+        ['network_finder/_search.c'],
+        extra_compile_args=["-O3"],
+    )
+    ext_modules = [cython_extension, search_extension]
 
 
 setup(
@@ -1,7 +1,18 @@
 from __future__ import unicode_literals
-from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
+from decimal import Decimal
+import pickle
+from unittest import skipIf, TestCase
 from network_finder import NetworkFinder
-from network_finder.network_finder import ip_mask, IPv4Network, IPv6Network
+from network_finder.network_finder import (
+    ColumnStore,
+    ip_mask,
+    IPv4Network,
+    IPv6Network,
+    Table,
+    _Table,
+)
 
 # Python 2 does not have TestCase.assertCountEqual
 try:
@@ -134,6 +145,70 @@ class IPNetworkTests(TestCase):
         with self.assertRaises(ValueError):
             IPv6Network('2001:0db8::/32', 'something')
 
+    def test_from_range_v4(self):
+        cases = [
+            ('192.0.2.0', '192.0.2.255', ['192.0.2.0/24']),
+            ('192.0.2.1', '192.0.2.1', ['192.0.2.1/32']),
+            (
+                '192.0.2.1',
+                '192.0.2.10',
+                [
+                    '192.0.2.1/32',
+                    '192.0.2.2/31',
+                    '192.0.2.4/30',
+                    '192.0.2.8/31',
+                    '192.0.2.10/32',
+                ],
+            ),
+            ('0.0.0.0', '255.255.255.255', ['0.0.0.0/0']),
+            (0, 255, ['0.0.0.0/24']),
+            ('255.255.255.254', '255.255.255.255', ['255.255.255.254/31']),
+        ]
+        for first, last, expected in cases:
+            actual = [str(x) for x in IPv4Network.from_range(first, last)]
+            self.assertEqual(actual, expected)
+
+        networks = IPv4Network.from_range(
+            '192.0.2.0', '192.0.4.255', {'key': 'value'}
+        )
+        self.assertEqual([x._data for x in networks], [{'key': 'value'}] * 2)
+        self.assertIsNot(networks[0]._data, networks[1]._data)
+        self.assertEqual(networks[1].broadcast_address, '192.0.4.255')
+
+        with self.assertRaises(ValueError):
+            IPv4Network.from_range('192.0.2.1', '192.0.2.0')
+
+        for first, last in ((0, 2**32), (-1, 0), (2**32, 2**32)):
+            with self.assertRaises(ValueError):
+                IPv4Network.from_range(first, last)
+
+        with self.assertRaises(ValueError):
+            IPv6Network.from_range(0, 2**128)
+
+        with self.assertRaises(ValueError):
+            NetworkFinder().add_ranges([(0, 255), (0, 2**33 - 1)])
+
+        with self.assertRaises(ValueError):
+            IPv4Network.from_range('192.0.2.0', '192.0.2.1', 'something')
+
+    def test_from_range_v6(self):
+        cases = [
+            (
+                '2001:db8::',
+                '2001:db8:ffff:ffff:ffff:ffff:ffff:ffff',
+                ['2001:db8::/32'],
+            ),
+            (
+                '2001:db8::1',
+                '2001:db8::2',
+                ['2001:db8::1/128', '2001:db8::2/128'],
+            ),
+            ('::', 'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff', ['::/0']),
+        ]
+        for first, last, expected in cases:
+            actual = [str(x) for x in IPv6Network.from_range(first, last)]
+            self.assertEqual(actual, expected)
+
     def test_hash(self):
         v4_net_set = {
             IPv4Network('192.0.2.0'),
@@ -286,6 +361,56 @@ class IPNetworkTests(TestCase):
         self.assertEqual(v6_net, eval(v6_str))
 
 
+class ColumnStoreTests(TestCase):
+    def test_rows(self):
+        store = ColumnStore(['asn', 'country'])
+        row_0 = store.add_row({'asn': 64496, 'country': 'US'})
+        row_1 = store.add_row({'country': 'US'})
+        self.assertEqual((row_0, row_1), (0, 1))
+        self.assertEqual(store.columns['asn'], [64496, None])
+        self.assertEqual(store.get_row(row_1), {'country': 'US'})
+
+        store.update_row(row_1, {'asn': 64497})
+        self.assertEqual(store.get_row(row_1), {'asn': 64497, 'country': 'US'})
+
+        with self.assertRaises(ValueError):
+            store.update_row(row_0, {'org': 'Example'})
+
+        # Freed rows are cleared and reused
+        store.free_row(row_0)
+        self.assertEqual(store.get_row(row_0), {})
+        self.assertEqual(store.add_row({'asn': 64498}), row_0)
+        self.assertEqual(len(store.columns['asn']), 2)
+
+    def test_intern(self):
+        store = ColumnStore(['org', 'asn'])
+        org_1 = ''.join(['Example', ' Org'])
+        org_2 = ''.join(['Example ', 'Org'])
+        self.assertIsNot(org_1, org_2)
+
+        row_1 = store.add_row({'org': org_1})
+        row_2 = store.add_row({'org': org_2})
+        self.assertIs(store.columns['org'][row_1], store.columns['org'][row_2])
+
+        # Equal values of different types are kept apart, and values that
+        # aren't strings or integers are stored as-is
+        row_3 = store.add_row({'org': True, 'asn': 1})
+        self.assertIs(store.columns['org'][row_3], True)
+        self.assertIs(store.columns['asn'][row_3], 1)
+        row_4 = store.add_row({'org': 0.0, 'asn': Decimal('1.0')})
+        for value in ([1], -0.0, Decimal('1.00')):
+            store.update_row(row_3, {'org': value})
+            self.assertIs(store.columns['org'][row_3], value)
+        store.free_row(row_4)
+
+        # Values are dropped when no row uses them
+        self.assertEqual(len(store._interned), 2)
+        store.update_row(row_1, {'org': 'Other Org', 'asn': None})
+        store.free_row(row_2)
+        store.free_row(row_3)
+        self.assertEqual(list(store._interned.values()), [['Other Org', 1]])
+
+
 class NetworkFinderTests(TestCase):
     def setUp(self):
         self.inst = NetworkFinder()
@@ -335,6 +460,69 @@ class NetworkFinderTests(TestCase):
         with self.assertRaises(KeyError):
             self.inst.delete('10.0.0.0/16')
 
+    def test_add_range(self):
+        slash_24 = self.inst.add('192.0.2.0/24', data={1: 2})
+
+        networks = self.inst.add_range('192.0.2.0', '192.0.3.127', {3: 4})
+        self.assertEqual(
+            [str(x) for x in networks], ['192.0.2.0/24', '192.0.3.0/25']
+        )
+        self.assertIs(networks[0], slash_24)
+        self.assertEqual(slash_24._data, {1: 2, 3: 4})
+        self.assertEqual(networks[1]._data, {3: 4})
+        self.assertEqual(self.inst._network_list, networks)
+
+    def test_add_ranges(self):
+        slash_16 = self.inst.add('10.0.0.0/16', data={1: 2})
+        slash_32 = self.inst.add('192.0.2.128')
+
+        self.inst.add_ranges(
+            [
+                ('192.0.2.0', '192.0.2.255', {'name': 'net'}),
+                ('10.0.0.0', '10.0.255.255', {3: 4}),
+                ('10.0.0.0', '10.0.255.255'),
+                ('198.51.100.0', '198.51.100.2'),
+                (0, 0),
+            ]
+        )
+        actual = [str(x) for x in self.inst._network_list]
+        expected = [
+            '0.0.0.0/32',
+            '10.0.0.0/16',
+            '192.0.2.0/24',
+            '192.0.2.128/32',
+            '198.51.100.0/31',
+            '198.51.100.2/32',
+        ]
+        self.assertEqual(actual, expected)
+
+        # Existing networks are kept, with any new data merged in
+        self.assertIs(self.inst._network_list[1], slash_16)
+        self.assertEqual(slash_16._data, {1: 2, 3: 4})
+        self.assertIs(self.inst._network_list[3], slash_32)
+        self.assertEqual(
+            self.inst.search_best('192.0.2.1')._data, {'name': 'net'}
+        )
+
+    def test_add_ranges_batches(self):
+        # Batches of each size give the same result as adding each range
+        expected = NetworkFinder()
+        batches = [
+            [(i * 4, i * 4 + 2, {'batch': 0}) for i in range(1000)],
+            [(i * 400 + 1, i * 400 + 4, {'batch': 1}) for i in range(20)],
+            [(i * 4, i * 4 + 2) for i in range(900, 1100)],
+            [(0, 7, {'batch': 3}), (4000, 4000)],
+        ]
+        for batch in batches:
+            self.inst.add_ranges(batch)
+            for args in batch:
+                expected.add_range(*args)
+
+            self.assertEqual(list(self.inst), list(expected))
+            self.assertEqual(
+                [x._data for x in self.inst], [x._data for x in expected]
+            )
+
     def test_user_data(self):
         # You should be able to store data on ip_network objects
         network = self.inst.add('192.0.2.1')
@@ -342,6 +530,190 @@ class NetworkFinderTests(TestCase):
         found = self.inst.search_exact('192.0.2.1')
         self.assertEqual(found._data['key'], 'value')
 
+    def test_fields(self):
+        inst = NetworkFinder(fields=['asn', 'country'])
+        slash_24 = inst.add('192.0.2.0/24', data={'asn': 64496})
+        self.assertEqual(repr(slash_24), "IPv4Network('192.0.2.0/24')")
+        self.assertEqual(slash_24.asn, 64496)
+        self.assertIsNone(slash_24.country)
+        with self.assertRaises(AttributeError):
+            slash_24.org
+
+        # Fields are read through properties, not __getattr__
+        self.assertIsInstance(vars(inst._ColumnarNetwork)['asn'], property)
+
+        slash_24.country = 'US'
+        self.assertEqual(inst._store.get_row(slash_24._data)['country'], 'US')
+        slash_32 = inst.add('192.0.2.1')
+        self.assertIsNone(slash_32._data)
+        slash_32.asn = 64497
+        self.assertEqual(inst.search_best('192.0.2.1').asn, 64497)
+
+        # Duplicates update the existing network's row
+        inst.add('192.0.2.0/24', data={'asn': 64498})
+        self.assertEqual((slash_24.asn, slash_24.country), (64498, 'US'))
+        inst.add('192.0.2.0/24')
+        self.assertEqual((slash_24.asn, slash_24.country), (64498, 'US'))
+
+        networks = inst.add_range(
+            '198.51.100.0', '198.51.100.2', {'country': 'NL'}
+        )
+        self.assertEqual([x.country for x in networks], ['NL', 'NL'])
+        inst.add_ranges(
+            [
+                ('192.0.2.0', '192.0.2.255', {'country': 'CA'}),
+                ('203.0.113.0', '203.0.113.255', {'asn': 64499}),
+            ]
+        )
+        self.assertEqual((slash_24.asn, slash_24.country), (64498, 'CA'))
+        self.assertEqual(inst.search_best('203.0.113.1').asn, 64499)
+
+        # Unknown fields in bulk ranges don't change the list or the store
+        network_list = list(inst)
+        free_rows = list(inst._store._free_rows)
+        size = inst._store._size
+        with self.assertRaises(ValueError):
+            inst.add_ranges(
+                [
+                    ('10.0.0.0', '10.0.0.255', {'asn': 64500}),
+                    ('10.0.1.0', '10.0.1.255', {'org': 'Example'}),
+                ]
+            )
+        self.assertEqual(list(inst), network_list)
+        self.assertEqual(inst._store._free_rows, free_rows)
+        self.assertEqual(inst._store._size, size)
+
+        # Deleted networks give up their rows, but keep their data
+        row = slash_24._data
+        inst.delete('192.0.2.0/24')
+        self.assertEqual(slash_24._data, {'asn': 64498, 'country': 'CA'})
+        self.assertIn(row, inst._store._free_rows)
+
+        free_rows = list(inst._store._free_rows)
+        slash_24.asn = 64499
+        slash_24.org = 'Example'
+        self.assertEqual(inst._store._free_rows, free_rows)
+
+        with self.assertRaises(ValueError):
+            inst.add('192.0.2.0/24', data={'org': 'Example'})
+        self.assertEqual(inst._store._free_rows, free_rows)
+
+        # Only declared fields can be set
+        with self.assertRaises(AttributeError):
+            slash_32.org = 'Example'
+        self.assertEqual(slash_32.asn, 64497)
+
+        # Data must be a dict (or None), not a row number
+        row = slash_32._data
+        for data in (3, 'asn', [('asn', 1)]):
+            with self.assertRaises(ValueError):
+                slash_32._data = data
+        self.assertEqual((slash_32._data, slash_32.asn), (row, 64497))
+
+        # Network attributes are set directly
+        slash_32.length = 32
+        self.assertEqual((slash_32.length, slash_32.asn), (32, 64497))
+
+        empty = inst.add('192.0.2.2')
+        with self.assertRaises(AttributeError):
+            empty.org = 'Example'
+        self.assertIsNone(empty._data)
+        self.assertEqual(inst._store._free_rows, free_rows)
+
+        # Networks only use the store once they're added to the finder
+        network = inst.IPNetwork('192.0.2.3', {'asn': 64500})
+        self.assertEqual(network._data, {'asn': 64500})
+        inst.search_exact('192.0.2.1')
+        self.assertEqual(inst._store._free_rows, free_rows)
+        inst.add('192.0.2.3', data=network._data)
+        self.assertEqual(inst._store._free_rows, free_rows[:-1])
+        self.assertEqual(inst.search_exact('192.0.2.3').asn, 64500)
+
+        for field in ('length', '_store', '_detach', '__class__'):
+            with self.assertRaises(ValueError):
+                NetworkFinder(fields=[field])
+
+    def test_fields_copy(self):
+        inst = NetworkFinder(fields=['asn'])
+        slash_24 = inst.add('192.0.2.0/24', data={'asn': 64496})
+        slash_32 = inst.add('192.0.2.1', data={'asn': 64497})
+        inst.add('192.0.2.2')
+
+        # Copies are plain networks, and don't share rows with the original
+        for network in (
+            copy(slash_24),
+            deepcopy(slash_24),
+            pickle.loads(pickle.dumps(slash_24)),
+        ):
+            self.assertEqual(network, slash_24)
+            self.assertIs(type(network), IPv4Network)
+            self.assertEqual(network._data, {'asn': 64496})
+            network.asn = 64498
+            del network
+            self.assertEqual(slash_24.asn, 64496)
+
+        inst.add('198.51.100.0/24', data={'asn': 64499})
+        self.assertEqual((slash_24.asn, slash_32.asn), (64496, 64497))
+
+        # Copied and unpickled finders have their own store
+        for inst_copy in (
+            copy(inst),
+            deepcopy(inst),
+            pickle.loads(pickle.dumps(inst)),
+        ):
+            self.assertIsNot(inst_copy._store, inst._store)
+            self.assertEqual(list(inst_copy), list(inst))
+            for network, network_copy in zip(inst, inst_copy):
+                self.assertIsNot(network, network_copy)
+                self.assertIsInstance(network_copy, inst_copy._ColumnarNetwork)
+                self.assertEqual(network.asn, network_copy.asn)
+
+            inst_copy.search_exact('192.0.2.0/24').asn = 1
+            inst_copy.add('203.0.113.0/24', data={'asn': 2})
+            inst_copy.delete('192.0.2.1')
+            self.assertEqual([x.asn for x in inst_copy], [1, None, 64499, 2])
+            del inst_copy
+            self.assertEqual(
+                [x.asn for x in inst], [64496, 64497, None, 64499]
+            )
+
+        # Finders without fields can be copied too. Shallow copies share
+        # their networks, but not their list.
+        self.inst.add('192.0.2.0/24', data={'name': 'net'})
+        inst_copy = copy(self.inst)
+        self.assertEqual(list(inst_copy), list(self.inst))
+        self.assertIs(
+            inst_copy.search_exact('192.0.2.0/24'),
+            self.inst.search_exact('192.0.2.0/24'),
+        )
+        inst_copy.delete('192.0.2.0/24')
+        self.assertEqual(len(self.inst), 1)
+
+        for inst_copy in (
+            deepcopy(self.inst),
+            pickle.loads(pickle.dumps(self.inst)),
+        ):
+            self.assertEqual(list(inst_copy), list(self.inst))
+            self.assertIsNot(
+                inst_copy.search_exact('192.0.2.0/24'),
+                self.inst.search_exact('192.0.2.0/24'),
+            )
+            self.assertEqual(
+                inst_copy.search_exact('192.0.2.0/24').name, 'net'
+            )
+
+    def test_old_pickle(self):
+        # Pickles from earlier versions hold the finder's __dict__
+        network = IPv4Network('192.0.2.0/24', {'name': 'net'})
+        inst = NetworkFinder.__new__(NetworkFinder)
+        inst.__setstate__(
+            {'_network_list': [network], 'IPNetwork': IPv4Network}
+        )
+        self.assertEqual(list(inst), [network])
+        self.assertEqual(inst.search_best('192.0.2.1').name, 'net')
+        inst.add('192.0.2.1')
+        self.assertEqual(len(inst), 2)
+
     def test_search_exact(self):
         slash_8 = self.inst.add('10.0.0.0/8')
         slash_16 = self.inst.add('10.0.0.0/16')
@@ -369,6 +741,97 @@ class NetworkFinderTests(TestCase):
         slash_0 = self.inst.add('0.0.0.0/0')
         self.assertEqual(self.inst.search_best('192.0.2.1'), slash_0)
 
+    def test_search_best_batch(self):
+        self.inst.add('10.0.0.0/8')
+        self.inst.add('10.0.0.0/13')
+        self.inst.add('10.0.0.0/16')
+        self.inst.add('10.0.0.0/24')
+        self.inst.add('10.0.2.0/24')
+
+        addresses = [
+            '10.0.0.0',
+            '10.0.1.255',
+            '10.0.2.1',
+            '10.128.0.0',
+            '192.0.2.1',
+            167772417,
+        ]
+        expected = [self.inst.search_best(x) for x in addresses]
+        self.assertEqual(expected[-2], None)
+        self.assertEqual(self.inst.search_best_batch(addresses), expected)
+        with ThreadPoolExecutor(4) as executor:
+            for chunk_size in (1, 2, 4, 16):
+                actual = self.inst.search_best_batch(
+                    addresses, executor, chunk_size
+                )
+                self.assertEqual(actual, expected)
+
+            self.assertEqual(self.inst.search_best_batch([], executor), [])
+
+        # Only addresses can be searched for, not networks
+        with self.assertRaises(ValueError):
+            self.inst.search_best_batch(['10.0.0.0/24'])
+
+        for address in (-1, 2**32, 2**128 + 5):
+            with self.assertRaises(ValueError):
+                self.inst.search_best_batch(['10.0.0.0', address])
+
+        # Changes to the list are reflected in later searches
+        slash_0 = self.inst.add('0.0.0.0/0')
+        self.assertEqual(self.inst.search_best_batch(['192.0.2.1']), [slash_0])
+        self.inst.delete('0.0.0.0/0')
+        self.assertEqual(self.inst.search_best_batch(['192.0.2.1']), [None])
+        self.inst.add_ranges([('192.0.2.0', '192.0.2.255')])
+        self.assertEqual(
+            [str(x) for x in self.inst.search_best_batch(['192.0.2.1'])],
+            ['192.0.2.0/24'],
+        )
+
+        # Finders can be pickled after a batch search
+        inst_copy = pickle.loads(pickle.dumps(self.inst))
+        self.assertEqual(list(inst_copy), list(self.inst))
+        self.assertEqual(
+            inst_copy.search_best_batch(addresses),
+            self.inst.search_best_batch(addresses),
+        )
+
+    def _check_table(self, cls):
+        net_ints = [0, 0, 2**64, 2**64 + 4, 2**127]
+        bcast_ints = [2**127 - 1, 15, 2**65 - 1, 2**64 + 7, 2**128 - 1]
+        cases = [
+            (0, 1),
+            (15, 1),
+            (16, 0),
+            (2**64 + 5, 3),
+            (2**64 + 8, 2),
+            (2**65, 0),
+            (2**127, 4),
+            (2**128 - 1, 4),
+        ]
+        table = cls(net_ints, bcast_ints)
+        actual = table.search_best([x for x, _ in cases])
+        self.assertEqual(actual, [i for _, i in cases])
+
+        self.assertEqual(cls([], []).search_best([0, 1]), [-1, -1])
+        self.assertEqual(cls([1], [1]).search_best([0, 1]), [-1, 0])
+
+        with self.assertRaises(ValueError):
+            cls([0, 1], [1])
+
+        # Integers that don't fit in 128 bits aren't wrapped around
+        for ip_int in (-1, 2**128, 2**128 + 5):
+            with self.assertRaises(OverflowError):
+                table.search_best([0, ip_int])
+            with self.assertRaises(OverflowError):
+                cls([ip_int], [0])
+
+    def test_table_python(self):
+        self._check_table(_Table)
+
+    @skipIf(Table is _Table, 'The _search extension is not built')
+    def test_table_c(self):
+        self._check_table(Table)
+
     def test_search_worst(self):
         slash_8 = self.inst.add('10.0.0.0/8')
         self.inst.add('10.0.0.0/13')
@@ -400,6 +863,108 @@ class NetworkFinderTests(TestCase):
             actual = [str(x) for x in self.inst.search_covered(arg)]
             self.assertEqual(actual, expected)
 
+    def test_iter_covered(self):
+        self.inst.add('10.0.0.0/8')
+        self.inst.add('10.0.0.0/13')
+        self.inst.add('10.0.0.0/31')
+        self.inst.add('10.255.255.255')
+        self.inst.add('11.0.0.0/16')
+
+        networks = self.inst.iter_covered('10.0.0.0/9')
+        self.assertEqual(
+            [str(x) for x in networks], ['10.0.0.0/13', '10.0.0.0/31']
+        )
+
+        networks = self.inst.iter_covered('10.0.0.0/8')
+        self.assertIs(next(networks), self.inst._network_list[0])
+        self.assertEqual(
+            [str(x) for x in networks],
+            ['10.0.0.0/13', '10.0.0.0/31', '10.255.255.255/32'],
+        )
+
+        self.assertEqual(list(self.inst.iter_covered('12.0.0.0/8')), [])
+
+    def test_iter_range(self):
+        self.inst.add('0.0.0.0/0')
+        self.inst.add('10.0.0.0/8')
+        self.inst.add('10.0.0.0/16')
+        self.inst.add('10.0.1.0/24')
+        self.inst.add('192.0.2.0/24')
+        self.inst.add('255.255.255.255')
+
+        cases = [
+            (
+                '10.0.0.0',
+                '10.0.1.0',
+                ['10.0.0.0/8', '10.0.0.0/16', '10.0.1.0/24'],
+            ),
+            ('10.0.0.1', '10.0.1.0', ['10.0.1.0/24']),
+            ('10.0.0.1', '10.0.0.255', []),
+            ('0.0.0.0', '9.255.255.255', ['0.0.0.0/0']),
+            (
+                '192.0.2.0',
+                '255.255.255.255',
+                ['192.0.2.0/24', '255.255.255.255/32'],
+            ),
+            (0, 2**32 - 1, [str(x) for x in self.inst._network_list]),
+            ('192.0.2.1', '10.0.0.0', []),
+        ]
+        for first, last, expected in cases:
+            actual = [str(x) for x in self.inst.iter_range(first, last)]
+            self.assertEqual(actual, expected)
+
+        for first, last in (
+            (0, 2**32),
+            (-1, 0),
+            (2**40, 2**32 - 1),
+            (5, -1),
+        ):
+            with self.assertRaises(ValueError):
+                self.inst.iter_range(first, last)
+
+    def test_iter_changed(self):
+        for i in range(8):
+            self.inst.add('10.{}.0.0/16'.format(i))
+
+        iterators = [
+            lambda: iter(self.inst),
+            lambda: self.inst.iter_covered('10.0.0.0/8'),
+            lambda: self.inst.iter_range('0.0.0.0', '255.255.255.255'),
+        ]
+        changes = [
+            lambda: self.inst.add('192.0.2.0/24'),
+            lambda: self.inst.delete('192.0.2.0/24'),
+            lambda: self.inst.add_ranges([('198.51.100.0', '198.51.100.3')]),
+        ]
+        for get_iterator in iterators:
+            for change in changes:
+                networks = get_iterator()
+                next(networks)
+                change()
+                with self.assertRaises(RuntimeError):
+                    next(networks)
+
+        # Changes made before iteration starts are caught too
+        networks = iter(self.inst)
+        self.inst.add('203.0.113.0/24')
+        with self.assertRaises(RuntimeError):
+            next(networks)
+
+        # Data changes and duplicate adds don't affect iteration
+        networks = iter(self.inst)
+        next(networks).name = 'first'
+        self.inst.add('10.1.0.0/16', data={'name': 'second'})
+        self.assertEqual(next(networks).name, 'second')
+
+    def test_iter_len(self):
+        self.assertEqual(len(self.inst), 0)
+        self.assertEqual(list(self.inst), [])
+
+        slash_16 = self.inst.add('10.0.0.0/16')
+        slash_8 = self.inst.add('10.0.0.0/8')
+        self.assertEqual(len(self.inst), 2)
+        self.assertEqual(list(self.inst), [slash_8, slash_16])
+
     def test_search_covering(self):
         self.inst.add('0.0.0.0/2')
         self.inst.add('8.9.0.1/32')
@@ -451,3 +1016,22 @@ class NetworkFinderTests(TestCase):
         self.assertCountEqual(
             inst.search_covering('fd00::/48'), [slash_16, slash_48]
         )
+
+        self.assertEqual(
+            list(inst.iter_covered('fd00::/48')), [slash_48, slash_64]
+        )
+        self.assertEqual(list(inst.iter_range('fd00::1', 'ffff::')), [])
+        self.assertEqual(
+            list(inst.iter_range('::', 'fd00::')),
+            [slash_16, slash_48, slash_64],
+        )
+
+        with ThreadPoolExecutor(2) as executor:
+            self.assertEqual(
+                inst.search_best_batch(
+                    ['fd00::', 'fd00:0000:0000:0001::', 'fe00::'],
+                    executor,
+                    chunk_size=2,
+                ),
+                [slash_64, slash_48, None],
+            )